@@ -44,19 +44,18 @@ except Exception as e:
     print(f"❌ Failed to initialize analyzer: {e}")
     analyzer = None
 
+ALLOWED_EXTENSIONS = frozenset({'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp'})
+
 def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in {'png','jpg','jpeg','gif','bmp','webp'}
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 def _ensure_min_width(img: Image.Image, min_w: int = 1024):
     """Upscale narrow screenshots for better OCR"""
     if img.width >= min_w:
-        return img, None
+        return img
     scale = float(min_w) / float(img.width)
     new_size = (min_w, int(round(img.height * scale)))
-    up = img.resize(new_size, Image.LANCZOS)
-    buf = BytesIO()
-    up.save(buf, format="PNG")
-    return up, buf.getvalue()
+    return img.resize(new_size, Image.LANCZOS)
 
 # CTA optimization is now handled by the RobustCTAAnalyzer class methods
 
@@ -111,9 +110,7 @@ def optimize_ctas():
                 filename = secure_filename(file.filename)
                 
                 # Optional upscale for better OCR
-                image, up_bytes = _ensure_min_width(image, min_w=1024)
-                if up_bytes is not None:
-                    image_bytes = up_bytes
+                image = _ensure_min_width(image, min_w=1024)
 
                 # Use the new CTA optimization method for images
                 optimization_results = analyzer.optimize_from_image(image, desired_behavior)
@@ -177,18 +174,19 @@ def api_optimize():
             if not design_url:
                 return jsonify({"error": "No design_url provided"}), 400
                 
-            # Extract CTAs first
-            raw_results = analyzer.analyze_url(design_url, desired_behavior=desired_behavior)
+            # Capture and OCR the page; optimize_ctas below is the only LLM call
+            screenshot, _ = analyzer._capture_screenshot(design_url)
             
-            if raw_results.get('error'):
+            if screenshot is None:
+                raw_results = analyzer._comprehensive_error_response(design_url)
                 return jsonify({"error": raw_results.get('message', 'URL analysis failed')}), 500
                 
-            cta_texts = extract_cta_texts(raw_results.get('ctas', []))
+            cta_texts = analyzer.extract_cta_texts({"ctas": analyzer._extract_cta_candidates(screenshot)})
             if not cta_texts:
                 return jsonify({"error": "No CTAs found on webpage"}), 400
                 
             # Optimize CTAs
-            optimization_results = optimize_ctas_with_ai(cta_texts, desired_behavior, analyzer)
+            optimization_results = analyzer.optimize_ctas(cta_texts, desired_behavior)
             
         # Handle file uploads
         else:
@@ -206,17 +204,16 @@ def api_optimize():
 
             image_bytes = f.read()
             image = Image.open(BytesIO(image_bytes)).convert('RGB')
-            image, _ = _ensure_min_width(image, min_w=1024)
+            image = _ensure_min_width(image, min_w=1024)
 
-            # Extract CTAs first
-            raw_results = analyzer.analyze(image, desired_behavior=desired_behavior)
-            cta_texts = extract_cta_texts(raw_results.get('ctas', []))
+            # OCR the image for CTA candidates (no vision LLM pass, see the URL branch)
+            cta_texts = analyzer.extract_cta_texts({"ctas": analyzer._extract_cta_candidates(image)})
             
             if not cta_texts:
                 return jsonify({"error": "No CTAs found in image"}), 400
                 
             # Optimize CTAs
-            optimization_results = optimize_ctas_with_ai(cta_texts, desired_behavior, analyzer)
+            optimization_results = analyzer.optimize_ctas(cta_texts, desired_behavior)
 
         processing_time = round(time.time() - start, 2)
 
@@ -1,11 +1,14 @@
 # robust_analyzer.py - Multiple URL capture methods
-import os, io, json, base64, re, time, subprocess, sys, platform
+import os, io, json, base64, re, time, subprocess, sys, platform, random, hashlib, threading, heapq
 from typing import Dict, Any, List, Optional
 from pathlib import Path
+from collections import OrderedDict
 from PIL import Image
+import numpy as np
 import requests
 from urllib.parse import quote, urljoin, urlparse
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from http.cookiejar import DefaultCookiePolicy
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 # Load .env
 try:
@@ -27,6 +30,35 @@ CTA_VERBS = {
     "free", "demo", "trial", "now", "today", "instant", "click", "shop"
 }
 
+CTA_PATTERNS = (
+    "click here", "learn more", "read more", "see more", "view all",
+    "get started", "sign up", "log in", "register now", "join now",
+    "buy now", "order now", "shop now", "add to cart", "checkout",
+    "book now", "reserve", "schedule", "contact us", "call now",
+    "download", "subscribe", "follow us", "share", "like us"
+)
+
+PROMO_WORDS = ("free", "discount", "save", "offer", "deal", "limited", "exclusive")
+
+# Single alternation over every CTA substring so detection is one regex scan
+CTA_TEXT_RE = re.compile("|".join(
+    re.escape(term) for term in sorted(CTA_VERBS.union(CTA_PATTERNS, PROMO_WORDS))
+))
+
+# Element type keyword groups used by _guess_element_type
+BUTTON_WORDS = ('get', 'start', 'buy', 'book', 'sign up', 'try', 'download', 'subscribe', 'join', 'register')
+MENU_WORDS = ('home', 'about', 'contact', 'services', 'products', 'login', 'menu')
+BANNER_WORDS = ('free', 'discount', 'offer', 'limited', 'save', 'sale', '%')
+FORM_WORDS = ('submit', 'send', 'search', 'go', 'find')
+LINK_PHRASES = ('learn more', 'read more', 'see more', 'view all', 'details')
+
+# Text cleanup patterns, compiled once instead of on every OCR box
+OCR_ARTIFACT_RE = re.compile(r'[^\w\s\-\.\,\!\?\(\)\$\+\%\&]')
+NON_WORD_RE = re.compile(r'[^\w\s]')
+WHITESPACE_RE = re.compile(r'\s+')
+# str.translate equivalent of NON_WORD_RE for ASCII text
+NON_WORD_ASCII_TABLE = str.maketrans({chr(c): ' ' for c in range(128) if NON_WORD_RE.match(chr(c))})
+
 
 SYSTEM_PROMPT = """You are a conversion rate optimization expert specializing in making CTAs literally describe the required user behavior.
 
@@ -85,6 +117,26 @@ class RobustCTAAnalyzer:
         self.model = (os.getenv("OPENAI_MODEL") or "gpt-4o-mini").strip()
         self.ocr = easyocr.Reader(['en'], gpu=False, verbose=False)
         
+        # Shared HTTP session so repeated fetches reuse pooled keep-alive connections;
+        # cookies are refused so one user's fetch can't leak state into another's
+        self.http = requests.Session()
+        self.http.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        
+        # OCR candidates keyed by image content hash, so repeated images skip EasyOCR
+        self._ocr_cache = OrderedDict()
+        try:
+            self._ocr_cache_size = max(0, int(os.getenv("OCR_CACHE_SIZE") or 64))
+        except ValueError:
+            print("⚠️ Invalid OCR_CACHE_SIZE, using 64")
+            self._ocr_cache_size = 64
+        self._ocr_cache_lock = threading.Lock()
+        
+        # Seconds a capture method may run before the next one is started alongside it
+        self._capture_hedge_delay = float(os.getenv("CAPTURE_HEDGE_SECONDS") or 20)
+        
+        # Resolved lazily by _get_chromedriver_path
+        self._chromedriver_path = None
+        
         # Initialize all capture methods
         self._init_all_methods()
         print("🔥 Robust CTA Analyzer initialized with multiple capture methods")
@@ -126,7 +178,6 @@ class RobustCTAAnalyzer:
     def _try_webdriver_manager(self):
         """Try webdriver-manager approach"""
         try:
-            from webdriver_manager.chrome import ChromeDriverManager
             from selenium import webdriver
             from selenium.webdriver.chrome.service import Service
             from selenium.webdriver.chrome.options import Options
@@ -136,7 +187,7 @@ class RobustCTAAnalyzer:
             options.add_argument('--no-sandbox')
             options.add_argument('--disable-dev-shm-usage')
             
-            service = Service(ChromeDriverManager().install())
+            service = Service(self._get_chromedriver_path())
             driver = webdriver.Chrome(service=service, options=options)
             driver.quit()
             return True
@@ -245,7 +296,16 @@ class RobustCTAAnalyzer:
         """Robust URL analysis with multiple fallback methods"""
         print(f"🌐 Starting robust URL analysis for: {url}")
         
-        # Try all available methods in parallel for speed
+        screenshot, method_name = self._capture_screenshot(url)
+        if screenshot is None:
+            # If all methods fail, return comprehensive error
+            return self._comprehensive_error_response(url)
+        
+        return self.analyze(screenshot, desired_behavior, source_url=url, 
+                          capture_method=method_name)
+
+    def _capture_screenshot(self, url: str):
+        """Capture a URL screenshot, returning (image, method_name) or (None, None)"""
         methods_to_try = [
             ('selenium', self._capture_with_selenium),
             ('playwright', self._capture_with_playwright),
@@ -261,21 +321,40 @@ class RobustCTAAnalyzer:
         
         print(f"🔄 Trying {len(available_methods)} capture methods...")
         
-        # Try methods in order of reliability
-        for method_name, method_func in available_methods:
-            try:
-                print(f"🎯 Attempting {method_name}...")
-                screenshot = method_func(url)
-                if screenshot:
-                    print(f"✅ {method_name} successful!")
-                    return self.analyze(screenshot, desired_behavior, source_url=url, 
-                                     capture_method=method_name)
-            except Exception as e:
-                print(f"❌ {method_name} failed: {e}")
-                continue
+        # Hedged start: methods run one at a time in order of reliability. The
+        # next one is launched as soon as the current one fails, or alongside it
+        # once it has been running longer than the hedge delay. A slow method
+        # that is overtaken is not cancelled; it finishes in the background.
+        pending = list(available_methods)
+        running = {}
+        executor = ThreadPoolExecutor(max_workers=len(available_methods))
+        try:
+            start_next = True
+            while pending or running:
+                if start_next and pending:
+                    method_name, func = pending.pop(0)
+                    print(f"🎯 Attempting {method_name}...")
+                    running[executor.submit(func, url)] = method_name
+                
+                done, _ = wait(running, timeout=self._capture_hedge_delay,
+                               return_when=FIRST_COMPLETED)
+                start_next = not done
+                for future in done:
+                    method_name = running.pop(future)
+                    try:
+                        screenshot = future.result()
+                    except Exception as e:
+                        print(f"❌ {method_name} failed: {e}")
+                        start_next = True
+                        continue
+                    if screenshot:
+                        print(f"✅ {method_name} successful!")
+                        return screenshot, method_name
+                    start_next = True
+        finally:
+            executor.shutdown(wait=False)
         
-        # If all methods fail, return comprehensive error
-        return self._comprehensive_error_response(url)
+        return None, None
 
     def _capture_with_selenium(self, url: str) -> Optional[Image.Image]:
         """Selenium capture with robust error handling"""
@@ -320,9 +399,9 @@ class RobustCTAAnalyzer:
                 driver.set_page_load_timeout(30)
                 driver.get(url)
                 
-                # Wait for page load and scroll to capture full page
-                time.sleep(3)
+                # Wait for page load, then for client-side rendering to settle
                 WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+                self._wait_for_stable_dom(driver)
                 
                 # Scroll to bottom to trigger lazy loading
                 driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
@@ -341,13 +420,19 @@ class RobustCTAAnalyzer:
             print(f"Selenium error: {e}")
             return None
 
+    def _get_chromedriver_path(self) -> str:
+        """Resolve the chromedriver binary once and reuse it for every driver"""
+        if self._chromedriver_path is None:
+            from webdriver_manager.chrome import ChromeDriverManager
+            self._chromedriver_path = ChromeDriverManager().install()
+        return self._chromedriver_path
+
     def _create_driver_with_manager(self, options):
         """Create driver with webdriver manager"""
-        from webdriver_manager.chrome import ChromeDriverManager
         from selenium import webdriver
         from selenium.webdriver.chrome.service import Service
         
-        service = Service(ChromeDriverManager().install())
+        service = Service(self._get_chromedriver_path())
         return webdriver.Chrome(service=service, options=options)
 
     def _create_driver_with_custom_path(self, options):
@@ -365,6 +450,18 @@ class RobustCTAAnalyzer:
                 return webdriver.Chrome(options=options)
         raise Exception("No Chrome binary found")
 
+    def _wait_for_stable_dom(self, driver, timeout: float = 3.0, interval: float = 0.5):
+        """Poll the element count until it stops changing, for at most `timeout` seconds"""
+        # driver.get already blocks until readyState is complete; SPAs keep
+        # rendering after that, so wait for the DOM itself to stop growing
+        last_count = None
+        for _ in range(max(1, int(timeout / interval))):
+            count = driver.execute_script("return document.getElementsByTagName('*').length")
+            if count == last_count:
+                return
+            last_count = count
+            time.sleep(interval)
+
     def _capture_with_playwright(self, url: str) -> Optional[Image.Image]:
         """Playwright capture"""
         if not self.methods.get('playwright', False):
@@ -482,6 +579,18 @@ const puppeteer = require('puppeteer');
             print(f"Puppeteer error: {e}")
             return None
 
+    def _get_with_retry(self, url: str, max_attempts: int = 3, **kwargs) -> requests.Response:
+        """GET with exponential backoff and jitter on connection failures"""
+        # ConnectTimeout is a ConnectionError and is retried; a ReadTimeout has
+        # already waited out the full timeout, so it is raised straight away
+        for attempt in range(max_attempts):
+            try:
+                return self.http.get(url, **kwargs)
+            except requests.ConnectionError:
+                if attempt == max_attempts - 1:
+                    raise
+                time.sleep(0.25 * 2 ** attempt + random.random() * 0.25)
+
     def _capture_with_services(self, url: str) -> Optional[Image.Image]:
         """Multiple screenshot services"""
         services = [
@@ -507,7 +616,7 @@ const puppeteer = require('puppeteer');
                 if "YOUR_TOKEN" in service["url"] or "YOUR_KEY" in service["url"]:
                     continue  # Skip unconfigured services
                     
-                response = requests.get(
+                response = self._get_with_retry(
                     service["url"], 
                     headers=service["headers"],
                     timeout=45
@@ -524,11 +633,11 @@ const puppeteer = require('puppeteer');
 
     def _capture_direct_image(self, url: str) -> Optional[Image.Image]:
         """Direct image download"""
-        if not any(url.lower().endswith(ext) for ext in ['.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp']):
+        if not url.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp')):
             return None
             
         try:
-            response = requests.get(url, timeout=20, headers={
+            response = self._get_with_retry(url, timeout=20, headers={
                 'User-Agent': 'Mozilla/5.0 (compatible; CTA-Analyzer/1.0)'
             })
             response.raise_for_status()
@@ -543,7 +652,8 @@ const puppeteer = require('puppeteer');
                source_url: str = None, capture_method: str = "unknown") -> Dict[str, Any]:
         """Enhanced analysis method"""
         w, h = image.size
-        data_url = "data:image/jpeg;base64," + base64.b64encode(self._to_jpeg(image, 85)).decode()
+        # The vision model downsamples to fit 2048px anyway, so don't upload more than that
+        data_url = "data:image/jpeg;base64," + base64.b64encode(self._to_jpeg(image, 85, max_side=2048)).decode()
 
         # Extract CTA candidates
         candidates = self._extract_cta_candidates(image)
@@ -568,7 +678,7 @@ const puppeteer = require('puppeteer');
                     {"role": "user", "content": [
                         {"type": "text", "text": f"""Analyze CTA candidates for conflicts:
 
-{json.dumps(user_payload, indent=2)}
+{json.dumps(user_payload, separators=(",", ":"))}
 
 Find real conflicts that hurt conversions. Be practical and actionable.
 Respond with STRICT JSON only."""},
@@ -584,14 +694,39 @@ Respond with STRICT JSON only."""},
         return self._process_results(parsed, candidates, desired_behavior, w, h, source_url, capture_method)
 
     def _extract_cta_candidates(self, image: Image.Image) -> List[Dict[str, Any]]:
-        """Enhanced CTA extraction"""
-        img = image.convert("RGB")
+        """CTA extraction, memoized by image content hash"""
+        img = image if image.mode == "RGB" else image.convert("RGB")
+        pixels = img.tobytes()
+        key = (img.size, hashlib.blake2b(pixels, digest_size=16).digest())
+        
+        with self._ocr_cache_lock:
+            cached = self._ocr_cache.get(key)
+            if cached is not None:
+                self._ocr_cache.move_to_end(key)
+        if cached is not None:
+            print("♻️ Reusing cached OCR candidates")
+            # Copy the dicts and their bbox lists so callers can't mutate the cache
+            return [dict(c, bbox=list(c["bbox"])) for c in cached]
+        
+        # Reuse the hashed pixel buffer as the OCR input instead of copying the image again
+        pixels_array = np.frombuffer(pixels, dtype=np.uint8).reshape(img.height, img.width, 3)
+        result = self._ocr_cta_candidates(img, pixels_array)
+        if self._ocr_cache_size == 0:
+            return result
         
+        with self._ocr_cache_lock:
+            self._ocr_cache[key] = result
+            while self._ocr_cache and len(self._ocr_cache) > self._ocr_cache_size:
+                self._ocr_cache.popitem(last=False)
+        return [dict(c, bbox=list(c["bbox"])) for c in result]
+
+    def _ocr_cta_candidates(self, img: Image.Image, pixels: np.ndarray) -> List[Dict[str, Any]]:
+        """Enhanced CTA extraction"""
         # Use multiple OCR passes for better results
         ocr_results = []
         
         # Pass 1: Normal resolution
-        results1 = self.ocr.readtext(self._to_numpy(img), detail=1, paragraph=False)
+        results1 = self.ocr.readtext(pixels, detail=1, paragraph=False)
         ocr_results.extend(results1)
         
         # Pass 2: High resolution if image is small
@@ -604,7 +739,9 @@ Respond with STRICT JSON only."""},
                 scaled_quad = [(p[0]/scale, p[1]/scale) for p in quad]
                 ocr_results.append((scaled_quad, text, conf))
         
-        candidates = []
+        # Deduplicate by normalized text while scanning, keeping the highest score,
+        # and only build candidate dicts for the survivors
+        best = {}
         for (quad, text, conf) in ocr_results:
             try:
                 if not text or float(conf) < 0.2:
@@ -643,28 +780,23 @@ Respond with STRICT JSON only."""},
                 
                 score = min(100, int(area_pct * 5 + above_fold_bonus + center_bonus + cta_bonus))
 
-                candidates.append({
-                    "extracted_text": cleaned_text,
-                    "bbox": bbox,
-                    "ocr_confidence": round(float(conf), 3),
-                    "area_px": area_px,
-                    "preliminary_score": score,
-                    "element_type": self._guess_element_type(cleaned_text, bbox, img.width, img.height)
-                })
+                key = self._normalize_text(cleaned_text)
+                if key not in best or best[key][0] < score:
+                    best[key] = (score, cleaned_text, bbox, conf, area_px)
                 
             except Exception:
                 continue
 
-        # Advanced deduplication and filtering
-        seen = {}
-        for c in candidates:
-            key = self._normalize_text(c["extracted_text"])
-            if key not in seen or seen[key]["preliminary_score"] < c["preliminary_score"]:
-                seen[key] = c
-                
-        result = list(seen.values())
-        result.sort(key=lambda x: x["preliminary_score"], reverse=True)
-        return result[:15]
+        # Partial sort: only the top 15 survivors are kept, so avoid sorting them all
+        top = heapq.nlargest(15, best.values(), key=lambda item: item[0])
+        return [{
+            "extracted_text": cleaned_text,
+            "bbox": bbox,
+            "ocr_confidence": round(float(conf), 3),
+            "area_px": area_px,
+            "preliminary_score": score,
+            "element_type": self._guess_element_type(cleaned_text, bbox, img.width, img.height)
+        } for score, cleaned_text, bbox, conf, area_px in top]
 
     def _guess_element_type(self, text: str, bbox: List[int], img_width: int, img_height: int) -> str:
         """Enhanced element type detection"""
@@ -674,12 +806,12 @@ Respond with STRICT JSON only."""},
         y_pos = bbox[1]
         
         # Button indicators (action words)
-        if any(word in text_lower for word in ['get', 'start', 'buy', 'book', 'sign up', 'try', 'download', 'subscribe', 'join', 'register']):
+        if any(word in text_lower for word in BUTTON_WORDS):
             return "button"
         
         # Navigation/menu (top of page)
         if y_pos < img_height * 0.15:
-            if any(word in text_lower for word in ['home', 'about', 'contact', 'services', 'products', 'login', 'menu']):
+            if any(word in text_lower for word in MENU_WORDS):
                 return "menu"
         
         # Footer links (bottom of page)
@@ -687,15 +819,15 @@ Respond with STRICT JSON only."""},
             return "link"
             
         # Banner/promotional (large, marketing language)
-        if width > img_width * 0.3 and any(word in text_lower for word in ['free', 'discount', 'offer', 'limited', 'save', 'sale', '%']):
+        if width > img_width * 0.3 and any(word in text_lower for word in BANNER_WORDS):
             return "banner"
         
         # Form elements
-        if any(word in text_lower for word in ['submit', 'send', 'search', 'go', 'find']):
+        if any(word in text_lower for word in FORM_WORDS):
             return "form"
             
         # Links (descriptive text)
-        if any(word in text_lower for word in ['learn more', 'read more', 'see more', 'view all', 'details']):
+        if any(word in text_lower for word in LINK_PHRASES):
             return "link"
             
         # Default based on aspect ratio
@@ -959,8 +1091,8 @@ Respond with STRICT JSON only."""},
             return ""
         
         # Remove OCR artifacts
-        text = re.sub(r'[^\w\s\-\.\,\!\?\(\)\$\+\%\&]', ' ', text)
-        text = re.sub(r'\s+', ' ', text)
+        text = OCR_ARTIFACT_RE.sub(' ', text)
+        text = WHITESPACE_RE.sub(' ', text)
         
         # Fix common OCR mistakes
         replacements = {
@@ -980,50 +1112,28 @@ Respond with STRICT JSON only."""},
         if not text_lower or len(text_lower) < 2:
             return False
         
-        words = text_lower.split()
-        
-        # Direct CTA verb matches
-        if any(verb in text_lower for verb in CTA_VERBS):
-            return True
-        
-        # Common CTA patterns
-        cta_patterns = [
-            "click here", "learn more", "read more", "see more", "view all",
-            "get started", "sign up", "log in", "register now", "join now",
-            "buy now", "order now", "shop now", "add to cart", "checkout",
-            "book now", "reserve", "schedule", "contact us", "call now",
-            "download", "subscribe", "follow us", "share", "like us"
-        ]
-        
-        if any(pattern in text_lower for pattern in cta_patterns):
-            return True
-        
-        # Button-like characteristics
-        if (len(words) <= 4 and 
-            any(word in CTA_VERBS for word in words) and
-            not any(word in text_lower for word in ['the', 'and', 'or', 'but', 'with'])):
-            return True
-        
-        # Promotional language
-        promo_words = ['free', 'discount', 'save', 'offer', 'deal', 'limited', 'exclusive']
-        if any(word in text_lower for word in promo_words):
-            return True
-        
-        return False
+        # CTA verbs, common CTA patterns and promotional language in one scan
+        return CTA_TEXT_RE.search(text_lower) is not None
 
     def _normalize_text(self, text: str) -> str:
         """Normalize text for deduplication"""
-        return re.sub(r'\s+', ' ', re.sub(r'[^\w\s]', ' ', text.lower())).strip()
+        text = text.lower()
+        if text.isascii():
+            # Fast path for OCR output: no regex engine, split() collapses whitespace
+            return ' '.join(text.translate(NON_WORD_ASCII_TABLE).split())
+        return WHITESPACE_RE.sub(' ', NON_WORD_RE.sub(' ', text)).strip()
 
     def _to_numpy(self, pil_image: Image.Image):
         """Convert PIL to numpy array"""
-        import numpy as np
-        return np.array(pil_image)
+        return np.asarray(pil_image)
 
-    def _to_jpeg(self, img: Image.Image, quality: int = 85) -> bytes:
-        """Convert to JPEG bytes"""
+    def _to_jpeg(self, img: Image.Image, quality: int = 85, max_side: Optional[int] = None) -> bytes:
+        """Convert to JPEG bytes, optionally downscaled so the longest side fits max_side"""
         if img.mode not in ("RGB", "L"):
             img = img.convert("RGB")
+        if max_side and max(img.size) > max_side:
+            img = img.copy()
+            img.thumbnail((max_side, max_side), Image.LANCZOS)
         buf = io.BytesIO()
         img.save(buf, format="JPEG", quality=quality, optimize=True)
         return buf.getvalue()
@@ -1038,6 +1148,7 @@ Respond with STRICT JSON only."""},
         print(f"📋 Found {len(ctas_data)} CTA candidates to process")
         
         cta_texts = []
+        seen_texts = set()
         
         for i, cta in enumerate(ctas_data):
             print(f"🔍 Processing CTA {i+1}: {cta}")
@@ -1067,7 +1178,8 @@ Respond with STRICT JSON only."""},
                 continue
             
             # Add if not duplicate
-            if text not in cta_texts:
+            if text not in seen_texts:
+                seen_texts.add(text)
                 cta_texts.append(text)
                 print(f"✅ CTA {i+1}: '{text}' (extracted)")
             else:
@@ -1221,19 +1333,20 @@ Transform these CTAs into specific, behavior-explicit alternatives. Focus on lit
         """Complete CTA optimization workflow from URL"""
         print(f"🌐 Starting CTA optimization for: {url}")
         
-        # Step 1: Analyze URL to extract CTAs
-        raw_results = self.analyze_url(url, desired_behavior=goal_context)
+        # Step 1: Capture the page and OCR its CTA candidates. The vision LLM pass in
+        # analyze() is skipped because optimize_ctas makes the only LLM call we use
+        screenshot, capture_method = self._capture_screenshot(url)
         
-        if raw_results.get('error'):
+        if screenshot is None:
             return {
                 "error": True,
-                "message": raw_results.get('message', 'URL analysis failed'),
+                "message": "Unable to capture screenshot from URL",
                 "optimizations": [],
                 "summary": {"total_analyzed": 0, "avg_original_literalness": 0, "avg_improved_literalness": 0, "total_improvement": 0}
             }
         
         # Step 2: Extract CTA texts
-        cta_texts = self.extract_cta_texts(raw_results)
+        cta_texts = self.extract_cta_texts({"ctas": self._extract_cta_candidates(screenshot)})
         
         if not cta_texts:
             return {
@@ -1251,7 +1364,7 @@ Transform these CTAs into specific, behavior-explicit alternatives. Focus on lit
         # Step 4: Add metadata
         optimization_results['meta'] = {
             'source_url': url,
-            'capture_method': raw_results.get('meta', {}).get('capture_method', 'unknown'),
+            'capture_method': capture_method,
             'total_ctas_found': len(cta_texts),
             'analysis_type': 'cta_optimization'
         }
@@ -1262,11 +1375,11 @@ Transform these CTAs into specific, behavior-explicit alternatives. Focus on lit
         """Complete CTA optimization workflow from image"""
         print(f"📷 Starting CTA optimization from uploaded image")
         
-        # Step 1: Analyze image to extract CTAs
-        raw_results = self.analyze(image, desired_behavior=goal_context)
+        # Step 1: OCR the image for CTA candidates (no vision LLM pass, see optimize_from_url)
+        candidates = self._extract_cta_candidates(image)
         
         # Step 2: Extract CTA texts  
-        cta_texts = self.extract_cta_texts(raw_results)
+        cta_texts = self.extract_cta_texts({"ctas": candidates})
         
         if not cta_texts:
             return {
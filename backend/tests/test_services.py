@@ -0,0 +1,236 @@
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+import robust_analyzer
+from robust_analyzer import RobustCTAAnalyzer
+
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    """Analyzer with the OpenAI client, EasyOCR reader and browser probing stubbed out"""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(robust_analyzer, "OpenAI", lambda api_key: object())
+    monkeypatch.setattr(robust_analyzer.easyocr, "Reader", lambda *args, **kwargs: object())
+    monkeypatch.setattr(RobustCTAAnalyzer, "_init_all_methods", lambda self: None)
+    instance = RobustCTAAnalyzer()
+    instance.methods = {}
+    return instance
+
+
+def test_capture_screenshot_falls_through_in_order(analyzer):
+    calls = []
+
+    def failing(url):
+        calls.append("screenshot_services")
+        raise RuntimeError("boom")
+
+    def succeeding(url):
+        calls.append("direct_image")
+        return "image"
+
+    analyzer._capture_with_services = failing
+    analyzer._capture_direct_image = succeeding
+
+    assert analyzer._capture_screenshot("https://example.com") == ("image", "direct_image")
+    assert calls == ["screenshot_services", "direct_image"]
+
+
+def test_capture_screenshot_waits_before_hedging(analyzer):
+    started = []
+    release = threading.Event()
+
+    def slow(url):
+        started.append("screenshot_services")
+        release.wait(5)
+        return None
+
+    def fast(url):
+        started.append("direct_image")
+        return "image"
+
+    analyzer._capture_hedge_delay = 0.2
+    analyzer._capture_with_services = slow
+    analyzer._capture_direct_image = fast
+
+    begin = time.monotonic()
+    try:
+        result = analyzer._capture_screenshot("https://example.com")
+    finally:
+        release.set()
+
+    assert result == ("image", "direct_image")
+    assert started == ["screenshot_services", "direct_image"]
+    assert time.monotonic() - begin >= 0.2
+
+
+def test_capture_screenshot_returns_none_when_all_fail(analyzer):
+    analyzer._capture_with_services = lambda url: None
+    analyzer._capture_direct_image = lambda url: None
+
+    assert analyzer._capture_screenshot("https://example.com") == (None, None)
+
+
+class _FakeSession:
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def test_get_with_retry_backs_off_then_succeeds(analyzer, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(robust_analyzer.time, "sleep", sleeps.append)
+    monkeypatch.setattr(robust_analyzer.random, "random", lambda: 0.0)
+    analyzer.http = _FakeSession(
+        robust_analyzer.requests.ConnectionError(),
+        robust_analyzer.requests.ConnectTimeout(),
+        "response",
+    )
+
+    assert analyzer._get_with_retry("https://example.com", timeout=5) == "response"
+    assert analyzer.http.calls == 3
+    assert sleeps == [0.25, 0.5]
+
+
+def test_get_with_retry_raises_after_last_attempt(analyzer, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(robust_analyzer.time, "sleep", sleeps.append)
+    analyzer.http = _FakeSession(*[robust_analyzer.requests.ConnectionError()] * 3)
+
+    with pytest.raises(robust_analyzer.requests.ConnectionError):
+        analyzer._get_with_retry("https://example.com", max_attempts=3)
+    assert analyzer.http.calls == 3
+    assert len(sleeps) == 2
+
+
+def test_get_with_retry_does_not_retry_read_timeout(analyzer, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(robust_analyzer.time, "sleep", sleeps.append)
+    analyzer.http = _FakeSession(robust_analyzer.requests.ReadTimeout(), "response")
+
+    with pytest.raises(robust_analyzer.requests.ReadTimeout):
+        analyzer._get_with_retry("https://example.com")
+    assert analyzer.http.calls == 1
+    assert sleeps == []
+
+
+class _FakeDriver:
+    def __init__(self, *counts):
+        self.counts = list(counts)
+        self.polls = 0
+
+    def execute_script(self, script):
+        self.polls += 1
+        return self.counts.pop(0) if len(self.counts) > 1 else self.counts[0]
+
+
+def test_wait_for_stable_dom_returns_once_count_settles(analyzer, monkeypatch):
+    monkeypatch.setattr(robust_analyzer.time, "sleep", lambda seconds: None)
+    driver = _FakeDriver(10, 40, 40)
+
+    analyzer._wait_for_stable_dom(driver)
+    assert driver.polls == 3
+
+
+def test_wait_for_stable_dom_is_capped(analyzer, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(robust_analyzer.time, "sleep", sleeps.append)
+    driver = _FakeDriver(*range(100))
+
+    analyzer._wait_for_stable_dom(driver, timeout=3.0, interval=0.5)
+    assert sum(sleeps) == 3.0
+
+
+def test_http_session_refuses_cookies(analyzer):
+    from requests.cookies import MockRequest, MockResponse
+
+    request = robust_analyzer.requests.Request("GET", "https://example.com/").prepare()
+
+    class _Headers:
+        def get_all(self, name, default):
+            return ["session=abc; Path=/"] if name.lower() == "set-cookie" else default
+
+    analyzer.http.cookies.extract_cookies(MockResponse(_Headers()), MockRequest(request))
+    assert len(analyzer.http.cookies) == 0
+
+
+class _FakeOCR:
+    def __init__(self):
+        self.calls = 0
+
+    def readtext(self, pixels, detail=1, paragraph=False):
+        self.calls += 1
+        quad = [(100, 100), (400, 100), (400, 160), (100, 160)]
+        return [(quad, "Get Started", 0.9)]
+
+
+def _image(color):
+    return Image.new("RGB", (1200, 800), color)
+
+
+@pytest.fixture
+def ocr_analyzer(analyzer):
+    analyzer.ocr = _FakeOCR()
+    return analyzer
+
+
+def test_repeat_image_skips_ocr(ocr_analyzer):
+    first = ocr_analyzer._extract_cta_candidates(_image("white"))
+    second = ocr_analyzer._extract_cta_candidates(_image("white"))
+
+    assert ocr_analyzer.ocr.calls == 1
+    assert first == second
+    assert first[0]["extracted_text"] == "Get Started"
+
+
+def test_ocr_cache_evicts_least_recently_used(ocr_analyzer):
+    ocr_analyzer._ocr_cache_size = 2
+
+    ocr_analyzer._extract_cta_candidates(_image("white"))
+    ocr_analyzer._extract_cta_candidates(_image("black"))
+    ocr_analyzer._extract_cta_candidates(_image("white"))  # refreshes white
+    ocr_analyzer._extract_cta_candidates(_image("red"))    # evicts black
+    assert ocr_analyzer.ocr.calls == 3
+    assert len(ocr_analyzer._ocr_cache) == 2
+
+    ocr_analyzer._extract_cta_candidates(_image("white"))
+    assert ocr_analyzer.ocr.calls == 3
+    ocr_analyzer._extract_cta_candidates(_image("black"))
+    assert ocr_analyzer.ocr.calls == 4
+
+
+@pytest.mark.parametrize("value, expected", [("3", 3), ("-1", 0), ("lots", 64), ("", 64)])
+def test_ocr_cache_size_comes_from_env(monkeypatch, analyzer, value, expected):
+    monkeypatch.setenv("OCR_CACHE_SIZE", value)
+    assert RobustCTAAnalyzer()._ocr_cache_size == expected
+
+
+def test_ocr_cache_size_zero_disables_caching(ocr_analyzer):
+    ocr_analyzer._ocr_cache_size = 0
+
+    ocr_analyzer._extract_cta_candidates(_image("white"))
+    candidates = ocr_analyzer._extract_cta_candidates(_image("white"))
+    assert ocr_analyzer.ocr.calls == 2
+    assert len(ocr_analyzer._ocr_cache) == 0
+    assert candidates[0]["extracted_text"] == "Get Started"
+
+
+def test_mutating_returned_candidates_does_not_touch_cache(ocr_analyzer):
+    first = ocr_analyzer._extract_cta_candidates(_image("white"))
+    first[0]["extracted_text"] = "changed"
+    first[0]["bbox"][0] = -1
+    first.clear()
+
+    second = ocr_analyzer._extract_cta_candidates(_image("white"))
+    assert ocr_analyzer.ocr.calls == 1
+    assert second[0]["extracted_text"] == "Get Started"
+    assert second[0]["bbox"][0] == 100
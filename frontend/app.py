@@ -1,16 +1,64 @@
 from flask import Flask, render_template, request, jsonify, send_file
+from flask.json.provider import DefaultJSONProvider
 import os
 import json
 from datetime import datetime
 import io
 import csv
+import threading
+from collections import deque
+from itertools import islice
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Serialize jsonify() responses with orjson, keeping Flask's output conventions.
+
+    Dates still go through Flask's encoder (HTTP date strings), keys are sorted and
+    debug responses are indented; anything orjson can't encode, such as integers
+    wider than 64 bits, falls back to DefaultJSONProvider. Unlike Flask, non-ASCII
+    text is emitted as UTF-8 rather than \\u escapes.
+    """
+
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+        except orjson.JSONEncodeError:
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'cta-optimization-bot-secret-key'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+if orjson is not None:
+    app.json = OrjsonProvider(app)
+
+# Store analysis history in memory (in production, use a database).
+# Bounded so a long-running process doesn't grow without limit; oldest entries drop first.
+analysis_history = deque(maxlen=500)
+# With orjson, each entry is also kept pre-serialized so /api/history can join the
+# stored bytes instead of re-encoding every entry on each request
+analysis_history_json = deque(maxlen=500)
+history_lock = threading.Lock()
 
-# Store analysis history in memory (in production, use a database)
-analysis_history = []
+def record_history(entry):
+    blob = app.json.dumps(entry).encode('utf-8') if orjson is not None else None
+    with history_lock:
+        analysis_history.append(entry)
+        if blob is not None:
+            analysis_history_json.append(blob)
 
 @app.route('/')
 def index():
@@ -25,7 +73,8 @@ def analyze_url():
     
     # Simulate API call to backend
     # In production, this would call your FastAPI backend
-    analysis_id = f"url_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    now = datetime.now()
+    analysis_id = f"url_{now.strftime('%Y%m%d_%H%M%S')}"
     
     # Mock results for demonstration
     mock_results = [
@@ -50,11 +99,11 @@ def analyze_url():
     ]
     
     # Save to history
-    analysis_history.append({
+    record_history({
         'id': analysis_id,
         'type': 'url',
         'input': url,
-        'timestamp': datetime.now().isoformat(),
+        'timestamp': now.isoformat(),
         'results': mock_results
     })
     
@@ -78,7 +127,8 @@ def analyze_image():
         return jsonify({'success': False, 'error': 'No file selected'}), 400
     
     # Simulate OCR processing
-    analysis_id = f"image_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    now = datetime.now()
+    analysis_id = f"image_{now.strftime('%Y%m%d_%H%M%S')}"
     
     # Mock results for demonstration
     mock_results = [
@@ -97,11 +147,11 @@ def analyze_image():
     ]
     
     # Save to history
-    analysis_history.append({
+    record_history({
         'id': analysis_id,
         'type': 'image',
         'input': file.filename,
-        'timestamp': datetime.now().isoformat(),
+        'timestamp': now.isoformat(),
         'results': mock_results
     })
     
@@ -126,7 +176,8 @@ def analyze_text():
     # Split text into lines and analyze each
     ctas = [line.strip() for line in text.split('\n') if line.strip()]
     
-    analysis_id = f"text_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    now = datetime.now()
+    analysis_id = f"text_{now.strftime('%Y%m%d_%H%M%S')}"
     
     # Mock results for demonstration
     mock_results = []
@@ -139,11 +190,11 @@ def analyze_text():
         })
     
     # Save to history
-    analysis_history.append({
+    record_history({
         'id': analysis_id,
         'type': 'text',
         'input': text,
-        'timestamp': datetime.now().isoformat(),
+        'timestamp': now.isoformat(),
         'results': mock_results
     })
     
@@ -164,7 +215,10 @@ def export_results():
     format_type = data.get('format', 'csv')
     
     if format_type == 'csv':
-        output = io.StringIO()
+        # Encode rows straight into the byte buffer that gets sent, instead of
+        # building a str and copying it into bytes afterwards
+        buffer = io.BytesIO()
+        output = io.TextIOWrapper(buffer, encoding='utf-8', newline='')
         writer = csv.writer(output)
         writer.writerow(['Original CTA', 'Suggested Improvement', 'Confidence', 'Source'])
         
@@ -176,9 +230,11 @@ def export_results():
                 result.get('source', '')
             ])
         
-        output.seek(0)
+        output.flush()
+        output.detach()
+        buffer.seek(0)
         return send_file(
-            io.BytesIO(output.getvalue().encode('utf-8')),
+            buffer,
             mimetype='text/csv',
             as_attachment=True,
             download_name=f'cta_optimization_results_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
@@ -191,7 +247,18 @@ def export_results():
 
 @app.route('/api/history')
 def get_history():
-    return jsonify(analysis_history)
+    offset = request.args.get('offset', 0, type=int)
+    limit = request.args.get('limit', type=int)
+    if offset < 0 or (limit is not None and limit < 0):
+        return jsonify({'success': False, 'error': 'offset and limit must be non-negative'}), 400
+    stop = offset + limit if limit is not None else None
+    if orjson is not None:
+        with history_lock:
+            page = list(islice(analysis_history_json, offset, stop))
+        return app.response_class(b'[' + b','.join(page) + b']', mimetype='application/json')
+    with history_lock:
+        page = list(islice(analysis_history, offset, stop))
+    return jsonify(page)
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5005)
@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# The frontend is a plain script directory, not a package; make `import app` work
+# no matter where pytest is started from
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
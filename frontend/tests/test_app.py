@@ -0,0 +1,94 @@
+from datetime import datetime
+
+import pytest
+
+import app as frontend
+
+
+@pytest.mark.skipif(frontend.orjson is None, reason="orjson not installed")
+def test_json_provider_sorts_keys_and_accepts_non_string_keys():
+    with frontend.app.app_context():
+        assert frontend.app.json.dumps({'b': 1, 'a': 2, 3: 'x'}) == '{"3":"x","a":2,"b":1}'
+        assert frontend.app.json.dumps({'at': datetime(2024, 1, 2, 3, 4, 5)}) == \
+            '{"at":"Tue, 02 Jan 2024 03:04:05 GMT"}'
+
+
+@pytest.mark.skipif(frontend.orjson is None, reason="orjson not installed")
+def test_json_provider_matches_flask_for_big_ints_and_indent():
+    with frontend.app.app_context():
+        big = {'n': 2 ** 70}
+        assert frontend.app.json.loads(frontend.app.json.dumps(big)) == big
+        assert frontend.app.json.dumps({'a': 1}, indent=2) == '{\n  "a": 1\n}'
+
+
+@pytest.fixture
+def client():
+    frontend.app.config['TESTING'] = True
+    _clear_history()
+    with frontend.app.test_client() as client:
+        yield client
+    _clear_history()
+
+
+def _clear_history():
+    frontend.analysis_history.clear()
+    frontend.analysis_history_json.clear()
+
+
+def _fill_history(count):
+    for i in range(count):
+        frontend.record_history({'id': i})
+
+
+def test_history_defaults_to_everything(client):
+    _fill_history(3)
+
+    response = client.get('/api/history')
+    assert response.status_code == 200
+    assert [entry['id'] for entry in response.get_json()] == [0, 1, 2]
+
+
+def test_history_offset_and_limit(client):
+    _fill_history(10)
+
+    assert [e['id'] for e in client.get('/api/history?offset=7').get_json()] == [7, 8, 9]
+    assert [e['id'] for e in client.get('/api/history?limit=2').get_json()] == [0, 1]
+    assert [e['id'] for e in client.get('/api/history?offset=4&limit=3').get_json()] == [4, 5, 6]
+    assert client.get('/api/history?offset=20').get_json() == []
+    assert client.get('/api/history?limit=0').get_json() == []
+
+
+def test_history_rejects_negative_offset_and_limit(client):
+    _fill_history(3)
+
+    for query in ('offset=-1', 'limit=-1'):
+        response = client.get(f'/api/history?{query}')
+        assert response.status_code == 400
+        assert response.get_json()['success'] is False
+
+
+def test_history_keeps_only_the_latest_500(client):
+    _fill_history(501)
+
+    history = client.get('/api/history').get_json()
+    assert len(history) == 500
+    assert history[0]['id'] == 1
+    assert history[-1]['id'] == 500
+
+
+def test_analyze_text_is_recorded_in_history(client):
+    response = client.post('/api/analyze-text', json={'text': 'Get started free'})
+    assert response.status_code == 200
+
+    history = client.get('/api/history').get_json()
+    assert len(history) == 1
+
+
+@pytest.mark.skipif(frontend.orjson is None, reason="orjson not installed")
+def test_history_serves_pre_serialized_entries(client):
+    frontend.record_history({'id': 1, 'at': datetime(2024, 1, 2, 3, 4, 5)})
+
+    assert len(frontend.analysis_history_json) == 1
+    response = client.get('/api/history')
+    assert response.mimetype == 'application/json'
+    assert response.get_json() == [{'at': 'Tue, 02 Jan 2024 03:04:05 GMT', 'id': 1}]
@@ -52,15 +52,17 @@ def main():
         "app": "src.main:app",
         "host": settings.host,
         "port": settings.port,
-        "reload": settings.debug,
         "log_level": settings.log_level.lower(),
         "access_log": True,
     }
     
-    # Add SSL configuration if in production
-    if not settings.debug:
+    if settings.debug:
+        uvicorn_config["reload"] = True
+    else:
+        # Production: one worker process per core by default, overridable with
+        # WEB_CONCURRENCY (reload can't be combined with workers)
         uvicorn_config.update({
-            "workers": 1,  # Single worker for now, can be increased
+            "workers": int(os.getenv("WEB_CONCURRENCY") or os.cpu_count() or 1),
             "loop": "uvloop",  # Performance improvement
             "http": "httptools",  # Performance improvement
         })